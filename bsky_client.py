@@ -0,0 +1,65 @@
+import os
+import sys
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+from atproto import AsyncClient, SessionEvent
+from atproto_client.exceptions import BadRequestError, UnauthorizedError
+
+load_dotenv()
+
+try:
+    from ciso8601 import parse_datetime as parse_iso
+except ImportError:
+    if sys.version_info >= (3, 11):
+        parse_iso = datetime.fromisoformat  # accepts the trailing 'Z' natively
+    else:
+        def parse_iso(value):
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+SESSION_DIR = Path.home() / '.cache' / 'skycap'
+
+_client = None
+_client_lock = asyncio.Lock()
+
+def _session_path(handle):
+    """Sessions are stored per handle so switching accounts never resumes the old one."""
+    return SESSION_DIR / f'session-{handle}'
+
+async def _login(client, handle):
+    """Resume the saved session if it is still valid, otherwise log in with the env credentials."""
+    try:
+        await client.login(session_string=_session_path(handle).read_text())
+        return
+    except (FileNotFoundError, ValueError, BadRequestError, UnauthorizedError):
+        pass  # missing, malformed, expired or revoked session; fall back to a password login
+    await client.login(handle, os.getenv('BSKY_APP_PASSWORD'))
+
+def _save_session(handle, session_string):
+    """Persist the session so the next start can skip the password login."""
+    try:
+        path = _session_path(handle)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch(mode=0o600, exist_ok=True)
+        path.write_text(session_string)
+    except Exception as e:
+        print(f"Failed to save session: {str(e)}")
+
+async def get_client():
+    """Return the shared AsyncClient, logging in on first use."""
+    global _client
+    async with _client_lock:
+        if _client is None:
+            handle = os.getenv('BSKY_HANDLE')
+            client = AsyncClient()
+
+            # Re-save on every refresh too, since refreshing rotates the refresh token
+            async def on_session_change(event, session):
+                if event in (SessionEvent.CREATE, SessionEvent.REFRESH):
+                    _save_session(handle, session.export())
+
+            client.on_session_change(on_session_change)
+            await _login(client, handle)
+            _client = client
+        return _client
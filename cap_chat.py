@@ -1,13 +1,20 @@
 import os
 import sys
 import json
+import orjson
 import threading
 import websocket
 import pyaudio
-import base64
+try:
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
 import signal
 import asyncio
-import queue
+import collections
+import atexit
+import re
+import socket
 from dotenv import load_dotenv
 from timeline import Timeline
 
@@ -18,95 +25,168 @@ AUDIO_FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 24000
 CHUNK = 1024
-interrupted = False
+CALLBACK_FRAMES = 256
+CAPTURE_QUEUE_MAX = 200
+SAMPLE_WIDTH = pyaudio.get_sample_size(AUDIO_FORMAT)
+SEND_BUFFER_SIZE = 256 * 1024
+_TYPE_RE = re.compile(rb'"type"\s*:\s*"([^"]+)"')
+_DELTA_RE = re.compile(rb'"delta"\s*:\s*"([A-Za-z0-9+/=]+)"')
+# High-frequency events that are dropped before the full JSON parse
+_IGNORED_EVENTS = frozenset({
+    b"response.audio_transcript.delta",
+    b"response.function_call_arguments.delta",
+    b"rate_limits.updated",
+    b"input_audio_buffer.committed",
+    b"input_audio_buffer.speech_stopped",
+})
+interrupted = threading.Event()
 
 def signal_handler(sig, frame):
-    global interrupted
-    interrupted = True
-    sys.exit(0)
+    interrupted.set()
 
 signal.signal(signal.SIGINT, signal_handler)
 
+_pa = None
+_pa_lock = threading.Lock()
+
+def _get_pa():
+    """Return the process-wide PyAudio instance, creating it on first use."""
+    global _pa
+    with _pa_lock:
+        if _pa is None:
+            _pa = pyaudio.PyAudio()
+            atexit.register(_pa.terminate)
+        return _pa
+
 class AudioPlayer:
-    def __init__(self):
-        self.p = pyaudio.PyAudio()
+    def __init__(self, pa=None):
+        self.p = pa or _get_pa()
+        self._flush_generation = 0
+        self._played_generation = 0
+        self._pending = bytearray()
+        self.audio_queue = collections.deque()
+        self.is_playing = True
+        self._close_lock = threading.Lock()
         self.stream = self.p.open(format=AUDIO_FORMAT,
                                   channels=CHANNELS,
                                   rate=RATE,
                                   output=True,
-                                  frames_per_buffer=CHUNK)
-        self.lock = threading.Lock()
-        self.audio_queue = queue.Queue()
-        self.is_playing = True
-        self.playback_thread = threading.Thread(target=self._playback_worker, daemon=True)
-        self.playback_thread.start()
-        
-    def _playback_worker(self):
-        while self.is_playing:
+                                  frames_per_buffer=CALLBACK_FRAMES,
+                                  stream_callback=self._out_cb)
+
+    def _out_cb(self, in_data, frame_count, time_info, status):
+        # Runs on PortAudio's thread; chunks queued before a flush are dropped
+        needed = frame_count * CHANNELS * SAMPLE_WIDTH
+        if self._played_generation != self._flush_generation:
+            self._played_generation = self._flush_generation
+            self._pending.clear()
+        while len(self._pending) < needed:
             try:
-                audio_chunk = self.audio_queue.get(timeout=0.1)
-                with self.lock:
-                    self.stream.write(audio_chunk)
-            except queue.Empty:
-                continue
+                generation, audio_chunk = self.audio_queue.popleft()
+            except IndexError:
+                break
+            if generation == self._flush_generation:
+                self._pending += audio_chunk
+        out = bytes(self._pending[:needed])
+        del self._pending[:needed]
+        if len(out) < needed:
+            out += bytes(needed - len(out))  # pad underruns with silence
+        return (out, pyaudio.paContinue)
             
     def play_audio(self, audio_bytes):
         if self.is_playing:
-            self.audio_queue.put(audio_bytes)
+            self.audio_queue.append((self._flush_generation, audio_bytes))
             
     def flush(self):
-        with self.lock:
-            while not self.audio_queue.empty():
-                try:
-                    self.audio_queue.get_nowait()
-                except queue.Empty:
-                    break
-            self.stream.stop_stream()
-            self.stream.start_stream()
+        # Bump first so the callback drops anything it pops mid-clear
+        self._flush_generation += 1
+        self.audio_queue.clear()
             
     def close(self):
-        self.is_playing = False
-        if self.playback_thread.is_alive():
-            self.playback_thread.join()
-        self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
+        # Both run() and on_close tear down, possibly at once from different threads
+        with self._close_lock:
+            if not self.is_playing:
+                return
+            self.is_playing = False
+            self.stream.stop_stream()
+            self.stream.close()
 
 class AudioSender:
-    def __init__(self, ws):
+    def __init__(self, ws, pa=None):
         self.ws = ws
-        self.p = pyaudio.PyAudio()
+        self.p = pa or _get_pa()
+        self._capture = collections.deque(maxlen=CAPTURE_QUEUE_MAX)
+        self._capture_ready = threading.Event()
         self.stream = self.p.open(format=AUDIO_FORMAT,
                                   channels=CHANNELS,
                                   rate=RATE,
                                   input=True,
-                                  frames_per_buffer=CHUNK)
+                                  frames_per_buffer=CALLBACK_FRAMES,
+                                  stream_callback=self._in_cb,
+                                  start=False)
         self.thread = threading.Thread(target=self.send_audio, daemon=True)
         self.running = False
+        self._stopped = False
+        self._stop_lock = threading.Lock()
+        self._prefix = b'{"type":"input_audio_buffer.append","audio":"'
+        self._suffix = b'"}'
+        self._batch_target = 4 * CHUNK * CHANNELS * SAMPLE_WIDTH
+        # Reused across batches; callbacks deliver fixed-size buffers that tile it exactly
+        self._batch = bytearray(self._batch_target)
+        self._batch_view = memoryview(self._batch)
+        self._batch_size = 0
+    def _in_cb(self, in_data, frame_count, time_info, status):
+        self._capture.append(in_data)
+        self._capture_ready.set()
+        return (None, pyaudio.paContinue)
     def start(self):
         self.running = True
+        self.stream.start_stream()
         self.thread.start()
     def send_audio(self):
         try:
-            while self.running and not interrupted:
-                data = self.stream.read(CHUNK, exception_on_overflow=False)
-                audio_base64 = base64.b64encode(data).decode('utf-8')
-                audio_event = {
-                    "type": "input_audio_buffer.append",
-                    "audio": audio_base64
-                }
-                self.ws.send(json.dumps(audio_event))
+            while self.running and not interrupted.is_set():
+                if not self._capture_ready.wait(timeout=0.1):
+                    continue
+                self._capture_ready.clear()
+                while self._capture:
+                    data = self._capture.popleft()
+                    end = self._batch_size + len(data)
+                    if end > self._batch_target:
+                        self.flush_batch()
+                        end = len(data)
+                    self._batch_view[self._batch_size:end] = data
+                    self._batch_size = end
+                    if self._batch_size >= self._batch_target:
+                        self.flush_batch()
         except Exception:
             self.running = False
+    def flush_batch(self):
+        if not self._batch_size:
+            return
+        # Encode the batch in one pass; per-chunk base64 would embed padding mid-string
+        audio_base64 = _b64.b64encode(self._batch_view[:self._batch_size], None)
+        self._batch_size = 0
+        # base64 output is JSON-safe, so the envelope can be spliced directly
+        self.ws.send(self._prefix + audio_base64 + self._suffix, opcode=websocket.ABNF.OPCODE_TEXT)
     def commit_buffer(self):
         commit_event = {"type": "input_audio_buffer.commit"}
-        self.ws.send(json.dumps(commit_event))
+        self.ws.send(orjson.dumps(commit_event), opcode=websocket.ABNF.OPCODE_TEXT)
     def stop(self):
-        self.running = False
-        self.commit_buffer()
-        self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self.running = False
+            if self.thread.is_alive() and self.thread is not threading.current_thread():
+                self.thread.join(timeout=1)
+            self.stream.stop_stream()
+            try:
+                self.flush_batch()
+                self.commit_buffer()
+            except websocket.WebSocketConnectionClosedException:
+                pass  # server already closed the connection; nothing left to send to
+            self.stream.close()
 
 class ChatStreaming:
     def __init__(self, api_key):
@@ -114,6 +194,7 @@ class ChatStreaming:
         self.ws = None
         self.audio_player = AudioPlayer()
         self.audio_sender = None
+        self._connected = threading.Event()
         self.timeline = Timeline()
         self.instructions = (
             "You are a helpful assistant designed to catch the user up on their bluesky timeline. You speak quickly and casually, very cheerful and with lots of emotion appropriate to the context.\n"
@@ -122,8 +203,10 @@ class ChatStreaming:
             "2. get_post_detail(post_number: int): Returns detailed information about the post with the given post number.\n"
             "Start by getting the first page and then summarizing anything interesting in it. Keep your answers concise be curious."
         )
+        self.build_session_payloads()
 
-    def send_response_create(self):
+    def build_session_payloads(self):
+        """Serialize the static session events; rerun if instructions or tools change."""
         response_create_event = {
             "type": "response.create",
             "response": {
@@ -131,15 +214,7 @@ class ChatStreaming:
                 "instructions": self.instructions
             }
         }
-        self.ws.send(json.dumps(response_create_event))
-
-    def on_open(self, ws):
-        print("WebSocket connection established")
-        self.audio_sender = AudioSender(ws)
-        self.audio_sender.start()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self.timeline.initialize())
+        self._response_create_bytes = orjson.dumps(response_create_event)
         session_update_event = {
             "type": "session.update",
             "session": {
@@ -183,12 +258,42 @@ class ChatStreaming:
                 "temperature": 0.7
             }
         }
-        ws.send(json.dumps(session_update_event))
+        self._session_update_bytes = orjson.dumps(session_update_event)
+
+    def send_response_create(self):
+        self.ws.send(self._response_create_bytes, opcode=websocket.ABNF.OPCODE_TEXT)
+
+    def on_open(self, ws):
+        print("WebSocket connection established")
+        self._connected.set()
+        self.audio_sender = AudioSender(ws)
+        self.audio_sender.start()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(self.timeline.initialize())
+        ws.send(self._session_update_bytes, opcode=websocket.ABNF.OPCODE_TEXT)
         self.send_response_create()
 
+    def on_data(self, ws, data, opcode, fin):
+        # Receive raw frame bytes so audio deltas never round-trip through str
+        if opcode == websocket.ABNF.OPCODE_TEXT:
+            if isinstance(data, str):
+                data = data.encode()  # websocket-client < 1.6 decodes text frames despite skip_utf8_validation
+            self.on_message(ws, data)
+
     def on_message(self, ws, message):
         try:
-            event = json.loads(message)
+            match = _TYPE_RE.search(message)
+            sniffed_type = match.group(1) if match else b""
+            if sniffed_type in _IGNORED_EVENTS:
+                return
+            if sniffed_type == b"response.audio.delta":
+                # The delta is plain base64, so slice it out without parsing the envelope
+                match = _DELTA_RE.search(message)
+                if match:
+                    self.audio_player.play_audio(_b64.b64decode(match.group(1), validate=False))
+                    return
+            event = orjson.loads(message)
             event_type = event.get("type")
 
             if event_type == "input_audio_buffer.speech_started":
@@ -196,7 +301,7 @@ class ChatStreaming:
             elif event_type == "response.function_call_arguments.done":
                 function_name = event.get("name")
                 arguments = event.get("arguments")
-                args = json.loads(arguments)
+                args = orjson.loads(arguments)
                 result = self.execute_function(function_name, args)
                 print(f"Function result: {json.dumps(result, indent=2)}\n")
                 function_call_output_event = {
@@ -204,17 +309,17 @@ class ChatStreaming:
                     "item": {
                         "type": "function_call_output",
                         "call_id": event.get("call_id"),
-                        "output": json.dumps(result)
+                        "output": orjson.dumps(result).decode()
                     }
                 }
                 print(f"Sending: {json.dumps(function_call_output_event, indent=2)}")
-                ws.send(json.dumps(function_call_output_event))
+                ws.send(orjson.dumps(function_call_output_event), opcode=websocket.ABNF.OPCODE_TEXT)
                 self.send_response_create()  # Add new response after function result
             elif event_type == "response.audio.delta":
                 audio_base64 = event.get("delta", "")
                 if audio_base64:
-                    audio_bytes = base64.b64decode(audio_base64)
-                    threading.Thread(target=self.audio_player.play_audio, args=(audio_bytes,), daemon=True).start()
+                    audio_bytes = _b64.b64decode(audio_base64, validate=False)
+                    self.audio_player.play_audio(audio_bytes)
             elif event_type == "response.audio_transcript.done":
                 transcript = event.get("transcript", "")
                 if transcript:
@@ -267,19 +372,25 @@ class ChatStreaming:
         self.ws = websocket.WebSocketApp(WEBSOCKET_URL,
                                          header=headers,
                                          on_open=self.on_open,
-                                         on_message=self.on_message,
+                                         on_data=self.on_data,
                                          on_error=self.on_error,
                                          on_close=self.on_close)
-        wst = threading.Thread(target=self.ws.run_forever, daemon=True)
+        wst = threading.Thread(target=self.ws.run_forever,
+                               kwargs={"skip_utf8_validation": True,
+                                       "sockopt": ((socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE),)},
+                               daemon=True)
         wst.start()
-        while not self.ws.sock or not self.ws.sock.connected:
-            pass
+        if not self._connected.wait(timeout=10):
+            print("Error: timed out connecting to the realtime API.")
+            self.ws.close()
+            self.audio_player.close()
+            return
         print("Listening and speaking to the assistant. Press Ctrl+C to exit.")
-        while not interrupted:
-            pass
-        self.ws.close()
+        interrupted.wait()
+        # Stop the sender first so its final batch and commit go out while the socket is open
         if self.audio_sender:
             self.audio_sender.stop()
+        self.ws.close()
         self.audio_player.close()
 
 def main():
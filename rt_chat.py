@@ -1,12 +1,18 @@
 import os
-import json
+import orjson
 import threading
 import websocket
 import pyaudio
-import base64
+try:
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
 import sys
 import signal
-from io import BytesIO
+import collections
+import atexit
+import re
+import socket
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file
@@ -19,101 +25,189 @@ WEBSOCKET_URL = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-
 AUDIO_FORMAT = pyaudio.paInt16  # 16-bit PCM
 CHANNELS = 1
 RATE = 24000  # 24kHz
-CHUNK = 1024  # Number of frames per buffer
+CHUNK = 1024  # Frames per batching unit for outgoing audio
+CALLBACK_FRAMES = 256  # Frames per PortAudio callback (~10ms)
+CAPTURE_QUEUE_MAX = 200  # Max captured buffers held before the oldest are dropped
+SAMPLE_WIDTH = pyaudio.get_sample_size(AUDIO_FORMAT)
+SEND_BUFFER_SIZE = 256 * 1024  # SO_SNDBUF for the websocket
+
+_TYPE_RE = re.compile(rb'"type"\s*:\s*"([^"]+)"')
+_DELTA_RE = re.compile(rb'"delta"\s*:\s*"([A-Za-z0-9+/=]+)"')
+# High-frequency events dropped before the full JSON parse (unless verbose)
+_IGNORED_EVENTS = frozenset({
+    b"response.audio_transcript.delta",
+    b"response.function_call_arguments.delta",
+    b"rate_limits.updated",
+    b"input_audio_buffer.committed",
+    b"input_audio_buffer.speech_stopped",
+})
 
 # Global flag for interruption
-interrupted = False
+interrupted = threading.Event()
 
 def signal_handler(sig, frame):
-    global interrupted
-    interrupted = True
+    interrupted.set()
     print("\nExiting...")
     sys.exit(0)
 
 # Register the signal handler for graceful shutdown
 signal.signal(signal.SIGINT, signal_handler)
 
+_pa = None
+_pa_lock = threading.Lock()
+
+def _get_pa():
+    """Return the process-wide PyAudio instance, creating it on first use."""
+    global _pa
+    with _pa_lock:
+        if _pa is None:
+            _pa = pyaudio.PyAudio()
+            atexit.register(_pa.terminate)
+        return _pa
+
 class AudioPlayer:
-    def __init__(self):
-        self.p = pyaudio.PyAudio()
+    def __init__(self, pa=None):
+        self.p = pa or _get_pa()
+        self._pending = bytearray()
+        self.audio_queue = collections.deque()
+        self.is_playing = True
         try:
             self.stream = self.p.open(format=AUDIO_FORMAT,
                                       channels=CHANNELS,
                                       rate=RATE,
                                       output=True,
-                                      frames_per_buffer=CHUNK)
+                                      frames_per_buffer=CALLBACK_FRAMES,
+                                      stream_callback=self._out_cb)
         except Exception as e:
             print(f"Failed to open audio stream: {e}")
             sys.exit(1)
-        self.lock = threading.Lock()
 
-    def play_audio(self, audio_bytes):
-        with self.lock:
+    def _out_cb(self, in_data, frame_count, time_info, status):
+        # Called from PortAudio's audio thread; must never block
+        needed = frame_count * CHANNELS * SAMPLE_WIDTH
+        while len(self._pending) < needed:
             try:
-                self.stream.write(audio_bytes)
-            except Exception as e:
-                print(f"Error playing audio: {e}")
+                self._pending += self.audio_queue.popleft()
+            except IndexError:
+                break
+        out = bytes(self._pending[:needed])
+        del self._pending[:needed]
+        if len(out) < needed:
+            out += bytes(needed - len(out))  # Pad underruns with silence
+        return (out, pyaudio.paContinue)
+
+    def play_audio(self, audio_bytes):
+        if self.is_playing:
+            self.audio_queue.append(audio_bytes)
 
     def close(self):
+        self.is_playing = False
         try:
             self.stream.stop_stream()
             self.stream.close()
-            self.p.terminate()
         except Exception as e:
             print(f"Error closing audio stream: {e}")
 
 class AudioSender:
-    def __init__(self, ws):
+    def __init__(self, ws, pa=None):
         self.ws = ws
-        self.p = pyaudio.PyAudio()
+        self.p = pa or _get_pa()
+        self._capture = collections.deque(maxlen=CAPTURE_QUEUE_MAX)
+        self._capture_ready = threading.Event()
         try:
             self.stream = self.p.open(format=AUDIO_FORMAT,
                                       channels=CHANNELS,
                                       rate=RATE,
                                       input=True,
-                                      frames_per_buffer=CHUNK)
+                                      frames_per_buffer=CALLBACK_FRAMES,
+                                      stream_callback=self._in_cb,
+                                      start=False)
         except Exception as e:
             print(f"Failed to open microphone stream: {e}")
             sys.exit(1)
         self.thread = threading.Thread(target=self.send_audio, daemon=True)
         self.running = False
+        self._stopped = False
+        self._stop_lock = threading.Lock()
+        self._prefix = b'{"type":"input_audio_buffer.append","audio":"'
+        self._suffix = b'"}'
+        self._batch_target = 4 * CHUNK * CHANNELS * SAMPLE_WIDTH  # Bytes per append event
+        # Reused across batches; callbacks deliver fixed-size buffers that tile it exactly
+        self._batch = bytearray(self._batch_target)
+        self._batch_view = memoryview(self._batch)
+        self._batch_size = 0
+
+    def _in_cb(self, in_data, frame_count, time_info, status):
+        # Called from PortAudio's audio thread; hand off to the sender thread
+        self._capture.append(in_data)
+        self._capture_ready.set()
+        return (None, pyaudio.paContinue)
 
     def start(self):
         self.running = True
+        self.stream.start_stream()
         self.thread.start()
         print("Started sending audio from the microphone.")
 
     def send_audio(self):
         try:
-            while self.running and not interrupted:
-                data = self.stream.read(CHUNK, exception_on_overflow=False)
-                audio_base64 = base64.b64encode(data).decode('utf-8')
-                audio_event = {
-                    "type": "input_audio_buffer.append",
-                    "audio": audio_base64  # Corrected key name
-                }
-                self.ws.send(json.dumps(audio_event))
+            while self.running and not interrupted.is_set():
+                if not self._capture_ready.wait(timeout=0.1):
+                    continue
+                self._capture_ready.clear()
+                while self._capture:
+                    data = self._capture.popleft()
+                    end = self._batch_size + len(data)
+                    if end > self._batch_target:
+                        self.flush_batch()
+                        end = len(data)
+                    self._batch_view[self._batch_size:end] = data
+                    self._batch_size = end
+                    if self._batch_size >= self._batch_target:
+                        self.flush_batch()
         except Exception as e:
             print(f"Error capturing/sending audio: {e}")
             self.running = False
 
+    def flush_batch(self):
+        if not self._batch_size:
+            return
+        # Encode the batch in one pass; per-chunk base64 would embed padding mid-string
+        audio_base64 = _b64.b64encode(self._batch_view[:self._batch_size], None)
+        self._batch_size = 0
+        # base64 output is JSON-safe, so the envelope can be spliced directly
+        self.ws.send(self._prefix + audio_base64 + self._suffix, opcode=websocket.ABNF.OPCODE_TEXT)
+
     def commit_buffer(self):
         commit_event = {
             "type": "input_audio_buffer.commit"
         }
         try:
-            self.ws.send(json.dumps(commit_event))
+            self.ws.send(orjson.dumps(commit_event), opcode=websocket.ABNF.OPCODE_TEXT)
             print("Committed audio buffer.")
         except Exception as e:
             print(f"Failed to commit audio buffer: {e}")
 
     def stop(self):
+        # run() and on_close can both get here, so only the first call tears down
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
         self.running = False
-        self.commit_buffer()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
         try:
             self.stream.stop_stream()
+        except Exception as e:
+            print(f"Error stopping microphone stream: {e}")
+        try:
+            self.flush_batch()
+        except Exception as e:
+            print(f"Failed to send buffered audio: {e}")
+        self.commit_buffer()
+        try:
             self.stream.close()
-            self.p.terminate()
             print("Stopped sending audio.")
         except Exception as e:
             print(f"Error closing microphone stream: {e}")
@@ -125,7 +219,15 @@ class ChatStreaming:
         self.audio_player = AudioPlayer()
         self.audio_sender = None
         self.verbose = verbose
-        self.audio_buffer = BytesIO()
+        self._connected = threading.Event()
+        # response.create never changes, so serialize it once
+        self._response_create_bytes = orjson.dumps({
+            "type": "response.create",
+            "response": {
+                "modalities": ["text", "audio"],
+                "instructions": "Please assist the user."
+            }
+        })
 
     def log(self, message):
         if self.verbose:
@@ -133,24 +235,41 @@ class ChatStreaming:
 
     def on_open(self, ws):
         print("Connected to server.")
+        self._connected.set()
         # Initialize and start audio sending
         self.audio_sender = AudioSender(ws)
         self.audio_sender.start()
 
         # Send response.create to initialize the session
-        response_create_event = {
-            "type": "response.create",
-            "response": {
-                "modalities": ["text", "audio"],
-                "instructions": "Please assist the user."
-            }
-        }
-        ws.send(json.dumps(response_create_event))
+        ws.send(self._response_create_bytes, opcode=websocket.ABNF.OPCODE_TEXT)
         print("Session initialized.")
 
+    def on_data(self, ws, data, opcode, fin):
+        # Receive raw frame bytes so audio deltas never round-trip through str
+        if opcode == websocket.ABNF.OPCODE_TEXT:
+            if isinstance(data, str):
+                data = data.encode()  # websocket-client < 1.6 decodes text frames despite skip_utf8_validation
+            self.on_message(ws, data)
+
     def on_message(self, ws, message):
         try:
-            event = json.loads(message)
+            # Sniff the event type so uninteresting events skip the full parse
+            match = _TYPE_RE.search(message)
+            sniffed_type = match.group(1) if match else b""
+            if sniffed_type in _IGNORED_EVENTS and not self.verbose:
+                return
+            if sniffed_type == b"response.audio.delta":
+                # The delta is plain base64, so slice it out without parsing the envelope
+                match = _DELTA_RE.search(message)
+                if match:
+                    try:
+                        self.audio_player.play_audio(_b64.b64decode(match.group(1), validate=False))
+                        print("Playing audio chunk...")
+                    except Exception as e:
+                        print(f"Failed to decode or play audio: {e}")
+                    return
+
+            event = orjson.loads(message)
             event_type = event.get("type")
             # self.log(f"Received event: {event}")  # Removed to suppress raw messages
 
@@ -164,9 +283,9 @@ class ChatStreaming:
                 audio_base64 = event.get("delta", "")
                 if audio_base64:
                     try:
-                        audio_bytes = base64.b64decode(audio_base64)
-                        # Play audio in a separate thread to avoid blocking
-                        threading.Thread(target=self.audio_player.play_audio, args=(audio_bytes,), daemon=True).start()
+                        audio_bytes = _b64.b64decode(audio_base64, validate=False)
+                        # Queue for the output callback to avoid blocking
+                        self.audio_player.play_audio(audio_bytes)
                         print("Playing audio chunk...")
                     except Exception as e:
                         print(f"Failed to decode or play audio: {e}")
@@ -201,7 +320,7 @@ class ChatStreaming:
             else:
                 self.log(f"Unhandled event type: {event_type}")
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             print("Received non-JSON message.")
         except Exception as e:
             print(f"Exception in on_message: {e}")
@@ -231,7 +350,7 @@ class ChatStreaming:
             }
         }
         try:
-            self.ws.send(json.dumps(event))
+            self.ws.send(orjson.dumps(event), opcode=websocket.ABNF.OPCODE_TEXT)
             print("Sending your message...")
             self.log(f"Sent user message: {message}")
         except Exception as e:
@@ -239,15 +358,8 @@ class ChatStreaming:
             self.log(f"Failed to send message: {e}")
 
         # Send response.create to trigger the assistant's response
-        response_create_event = {
-            "type": "response.create",
-            "response": {
-                "modalities": ["text", "audio"],
-                "instructions": "Please assist the user."
-            }
-        }
         try:
-            self.ws.send(json.dumps(response_create_event))
+            self.ws.send(self._response_create_bytes, opcode=websocket.ABNF.OPCODE_TEXT)
             self.log("Sent response.create after user message.")
         except Exception as e:
             print(f"Failed to send response.create: {e}")
@@ -262,17 +374,23 @@ class ChatStreaming:
         self.ws = websocket.WebSocketApp(WEBSOCKET_URL,
                                          header=headers,
                                          on_open=self.on_open,
-                                         on_message=self.on_message,
+                                         on_data=self.on_data,
                                          on_error=self.on_error,
                                          on_close=self.on_close)
 
         # Run WebSocket in a separate thread
-        wst = threading.Thread(target=self.ws.run_forever, daemon=True)
+        wst = threading.Thread(target=self.ws.run_forever,
+                               kwargs={"skip_utf8_validation": True,
+                                       "sockopt": ((socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE),)},
+                               daemon=True)
         wst.start()
 
         # Wait until the WebSocket connection is established
-        while not self.ws.sock or not self.ws.sock.connected:
-            pass
+        if not self._connected.wait(timeout=10):
+            print("Error: timed out connecting to server.")
+            self.ws.close()
+            self.audio_player.close()
+            return
 
         print("Welcome to OpenAI Chat with Audio Streaming!")
         print("Type your messages below. Press Ctrl+C to exit.\n")
@@ -290,9 +408,10 @@ class ChatStreaming:
                 print("\nExiting...")
                 break
 
-        self.ws.close()
+        # Stop the sender first so its final batch and commit go out while the socket is open
         if self.audio_sender:
             self.audio_sender.stop()
+        self.ws.close()
         self.audio_player.close()
 
 def main():
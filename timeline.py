@@ -1,26 +1,82 @@
-import os
+import asyncio
 from dotenv import load_dotenv
-from atproto import AsyncClient
+from bsky_client import get_client, parse_iso
 from datetime import datetime
-import humanize
 
 load_dotenv()
 
+# Flattens line breaks and tabs in post text to single spaces
+_NEWLINE_TABLE = str.maketrans({'\n': ' ', '\r': ' ', '\t': ' '})
+
+def _ago(now, dt):
+    """Compact relative age such as '45s', '5m', '2h' or '3d'."""
+    s = max(int((now - dt).total_seconds()), 0)
+    if s < 60:
+        return f"{s}s"
+    if s < 3600:
+        return f"{s // 60}m"
+    if s < 86400:
+        return f"{s // 3600}h"
+    return f"{s // 86400}d"
+
+def _fmt_images(post, embed):
+    # Count images and gather alt texts in the same pass
+    lines = [None]
+    count = 0
+    for img in embed.images:
+        count += 1
+        alt = getattr(img, 'alt', None)
+        if alt:
+            lines.append(f"└─ Alt: {alt}")
+    lines[0] = f"📷 {count} image(s)"
+    return "\n".join(lines)
+
+def _fmt_record(post, embed):
+    if hasattr(embed.record, 'value') and hasattr(embed.record.value, 'text'):
+        return f"💬 Quoted: {embed.record.value.text[:100]}..."
+    return None
+
+def _fmt_external(post, embed):
+    return f"🔗 Link: {embed.external.title}"
+
+def _fmt_video(post, embed):
+    return f"🎥 Video: {embed.video.mime_type}"
+
+# Maps embed view types to their formatters
+_EMBED_HANDLERS = {
+    'app.bsky.embed.images#view': _fmt_images,
+    'app.bsky.embed.record#view': _fmt_record,
+    'app.bsky.embed.external#view': _fmt_external,
+    'app.bsky.embed.video#view': _fmt_video,
+}
+
+def format_embed_info(post):
+    """Format embed information for display."""
+    embed = getattr(post, 'embed', None)
+    if embed is None:
+        return None
+    handler = _EMBED_HANDLERS.get(getattr(embed, 'py_type', None))
+    return handler(post, embed) if handler else None
+
 class Timeline:
     def __init__(self):
-        self.client = AsyncClient()
-        self.handle = os.getenv('BSKY_HANDLE')
-        self.password = os.getenv('BSKY_APP_PASSWORD')
+        self.client = None
         self.profile = None
         self.timeline = []
-        self.post_index = {}  # Maps numbered IDs to atproto post IDs
+        self.post_index = {}  # Maps numbered IDs to feed views
+        self._parsed_created = {}  # Maps post cids to parsed created_at datetimes
+        self._indexed_cids = set()  # Post cids already present in self.timeline
+        self.reposters = {}  # Maps post cids to handles of everyone who reposted them
         self.page_size = 10   # Number of posts per page
+        self._cursor = None   # Cursor for the page after the last one fetched
+        self._fetch_lock = asyncio.Lock()
         self.initialized = False
 
     async def initialize(self):
         """Initialize the client and fetch the timeline."""
         try:
-            self.profile = await self.client.login(self.handle, self.password)
+            self.client = await get_client()
+            self.profile = self.client.me
             await self.fetch_timeline()
             self.initialized = True
         except Exception as e:
@@ -32,36 +88,69 @@ class Timeline:
         try:
             timeline_data = await self.client.get_timeline(algorithm='reverse-chronological')
             self.timeline = timeline_data.feed
+            self._cursor = timeline_data.cursor
             self.build_post_index()
         except Exception as e:
             print(f"Failed to fetch timeline: {str(e)}")
             raise
 
-    def build_post_index(self):
-        """Build an index mapping numbered IDs to atproto post IDs."""
-        for idx, feed_view in enumerate(self.timeline):
-            self.post_index[idx + 1] = {
-                'cid': feed_view.post.cid,
-                'uri': feed_view.post.uri
-            }
-
-    def find_feed_view(self, post_number):
-        """Find a feed view by post number."""
-        post_info = self.post_index.get(post_number)
-        if not post_info:
-            return None
-        return next(
-            (fv for fv in self.timeline if fv.post.cid == post_info['cid']),
-            None
-        )
+    async def fetch_next_page(self):
+        """Fetch the page after the last one loaded, append it, and return how many new posts it added."""
+        if self._cursor is None or self._fetch_lock.locked():
+            return 0
+        async with self._fetch_lock:
+            timeline_data = await self.client.get_timeline(
+                algorithm='reverse-chronological', cursor=self._cursor
+            )
+            start = len(self.timeline)
+            self.timeline.extend(timeline_data.feed)
+            self._cursor = timeline_data.cursor
+            self.build_post_index(start=start)
+            return len(self.timeline) - start
+
+    def build_post_index(self, start=0):
+        """Build an index mapping numbered IDs to feed views, from start onwards.
+
+        Repeats of an already-indexed post (usually reposts) are dropped from the
+        timeline, and their reposters are recorded against the first occurrence.
+        """
+        if start == 0:
+            self.post_index = {}
+            self._indexed_cids = set()
+            self.reposters = {}
+        unique = []
+        for feed_view in self.timeline[start:]:
+            cid = feed_view.post.cid
+            if hasattr(feed_view.reason, 'by'):
+                self.reposters.setdefault(cid, []).append(feed_view.reason.by.handle)
+            if cid not in self._indexed_cids:
+                self._indexed_cids.add(cid)
+                unique.append(feed_view)
+        self.timeline[start:] = unique
+        for idx in range(start, len(self.timeline)):
+            feed_view = self.timeline[idx]
+            self.post_index[idx + 1] = feed_view
+            self.parsed_created_at(feed_view.post)
+
+    def parsed_created_at(self, post):
+        """Return the post's created_at as a datetime, parsing it only once."""
+        created_at = self._parsed_created.get(post.cid)
+        if created_at is None:
+            created_at = parse_iso(post.record.created_at)
+            self._parsed_created[post.cid] = created_at
+        return created_at
+
+    def humanized_age(self, post, now):
+        """Return the post's age in compact form, e.g. '5m'."""
+        return _ago(now, self.parsed_created_at(post))
 
     def get_post_detail(self, post_number):
         """Return rich details about a single post."""
         if not self.initialized:
             raise Exception("Timeline not initialized. Call 'initialize()' first.")
 
-        feed_view = self.find_feed_view(post_number)
-        if not feed_view:
+        feed_view = self.post_index.get(post_number)
+        if feed_view is None:
             return f"No post found with number {post_number}."
 
         detailed_info = self.format_detailed_post(feed_view)
@@ -76,100 +165,79 @@ class Timeline:
         end = start + self.page_size
         posts = self.timeline[start:end]
         minimal_info = []
+        now = datetime.now().astimezone()
 
         for idx, feed_view in enumerate(posts, start=start):
             post_number = idx + 1
-            summary = self.format_minimal_post(feed_view, post_number)
+            summary = self.format_minimal_post(feed_view, post_number, now=now)
             minimal_info.append(summary)
 
         return "\n".join(minimal_info)
 
-    def format_minimal_post(self, feed_view, post_number):
+    def format_minimal_post(self, feed_view, post_number, now=None):
         """Format minimal information for a single post."""
+        if now is None:
+            now = datetime.now().astimezone()
         author = feed_view.post.author
         record = feed_view.post.record
-        text_content = (record.text or '(no text content)').replace('\n', ' ')
-        created_at = datetime.fromisoformat(record.created_at.replace('Z', '+00:00'))
-        created_str = humanize.naturaltime(datetime.now().astimezone() - created_at)
+        text_content = (record.text or '(no text content)').translate(_NEWLINE_TABLE)
+        created_str = self.humanized_age(feed_view.post, now)
 
         summary = (
             f"{post_number}. {author.display_name} - {text_content[:50]}... • {created_str}"
         )
         return summary
 
-    def format_detailed_post(self, feed_view):
-        """Format rich details for a single post."""
+    def format_detailed_post(self, feed_view, now=None, count_lines_only=False):
+        """Format rich details for a single post, or just count its lines."""
+        if count_lines_only:
+            # Optional repost line, the post line, then the separator
+            return (1 if self.reposters.get(feed_view.post.cid) else 0) + 2
+        if now is None:
+            now = datetime.now().astimezone()
         summary_lines = []
 
         # Handle repost information
-        is_repost = hasattr(feed_view.reason, 'by')
-        if is_repost:
-            summary_lines.append(f"🔄 Reposted by @{feed_view.reason.by.handle}")
-            summary_lines.extend(self.format_post_content(feed_view.post, indent_level=1))
+        reposters = self.reposters.get(feed_view.post.cid)
+        if reposters:
+            summary_lines.append(f"🔄 Reposted by {self.format_reposters(reposters)}")
+            summary_lines.extend(self.format_post_content(feed_view.post, indent_level=1, now=now))
         else:
-            summary_lines.extend(self.format_post_content(feed_view.post))
+            summary_lines.extend(self.format_post_content(feed_view.post, now=now))
 
         summary_lines.append('-' * 80)
         return summary_lines
 
-    def format_post_content(self, post, indent_level=0):
+    def format_reposters(self, reposters, shown=2):
+        """Format reposter handles as '@a, @b (+3 more)'."""
+        handles = ", ".join(f"@{handle}" for handle in reposters[:shown])
+        if len(reposters) > shown:
+            handles += f" (+{len(reposters) - shown} more)"
+        return handles
+
+    def format_post_content(self, post, indent_level=0, now=None):
         """Format a post's content with specified indentation."""
+        if now is None:
+            now = datetime.now().astimezone()
         indent = "    " * indent_level
         record = post.record
         author = post.author
 
-        created_at = datetime.fromisoformat(record.created_at.replace('Z', '+00:00'))
-        created_str = humanize.naturaltime(datetime.now().astimezone() - created_at)
-
-        text_content = (record.text or '(no text content)').replace('\n', ' ')
-        post_line = f"{indent}[@{author.handle}] {author.display_name} - {text_content}"
+        created_str = self.humanized_age(post, now)
 
+        text_content = (record.text or '(no text content)').translate(_NEWLINE_TABLE)
         embed_info = self.format_embed_info(post)
-        if embed_info:
-            post_line += f" | {embed_info}"
+        embed_part = f" | {embed_info}" if embed_info else ""
 
-        post_line += (f" | 👍 {post.like_count} 🔄 {post.repost_count} 💬 {post.reply_count} "
+        # Built as one f-string so the line is allocated once
+        post_line = (f"{indent}[@{author.handle}] {author.display_name} - {text_content}{embed_part}"
+                     f" | 👍 {post.like_count} 🔄 {post.repost_count} 💬 {post.reply_count} "
                      f"📝 {post.quote_count} • {created_str}")
-
         return [post_line]
 
     def format_embed_info(self, post):
         """Format embed information for display."""
-        if not hasattr(post, 'embed') or post.embed is None:
-            return None
-
-        embed = post.embed
-
-        if embed.py_type == 'app.bsky.embed.images#view':
-            alt_texts = self.get_post_image_alt_texts(post)
-            image_info = f"📷 {len(embed.images)} image(s)"
-            if alt_texts:
-                image_info += "\n" + "\n".join(f"└─ Alt: {alt}" for alt in alt_texts)
-            return image_info
-        elif embed.py_type == 'app.bsky.embed.record#view':
-            if hasattr(embed.record, 'value') and hasattr(embed.record.value, 'text'):
-                return f"💬 Quoted: {embed.record.value.text[:100]}..."
-            return None
-        elif 'external' in embed.py_type:
-            return f"🔗 Link: {embed.external.title}"
-        elif 'video' in embed.py_type:
-            return f"🎥 Video: {embed.video.mime_type}"
-
-        return None
-
-    def get_post_image_alt_texts(self, post):
-        """Extract all image alt texts from a post."""
-        if not hasattr(post, 'embed') or post.embed is None:
-            return []
-
-        if post.embed.py_type == 'app.bsky.embed.images#view':
-            alt_texts = []
-            for img in post.embed.images:
-                if hasattr(img, 'alt') and img.alt:
-                    alt_texts.append(img.alt)
-            return alt_texts
-
-        return []
+        return format_embed_info(post)
 
     async def lookup_post(self, uri: str):
         try:
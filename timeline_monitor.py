@@ -1,22 +1,54 @@
 import asyncio
 import textwrap
 from html import escape
-import os
+import time
 from dotenv import load_dotenv
 from datetime import datetime
 import humanize
 
-from atproto import AsyncClient
+from bsky_client import get_client, parse_iso
+from pybloom_live import BloomFilter
 
 load_dotenv()
 
 FETCH_NOTIFICATIONS_DELAY_SEC = 5
+FETCH_LIMIT = 50
+FETCH_MAX_PAGES = 5
+SEEN_ROTATE_SEC = 30 * 60
+
+class SeenPosts:
+    """Bounded cid dedup: two bloom filters, the older one dropped every rotation period."""
+
+    def __init__(self, capacity=10_000, error_rate=1e-6, rotate_sec=SEEN_ROTATE_SEC):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rotate_sec = rotate_sec
+        self.current = BloomFilter(capacity=capacity, error_rate=error_rate)
+        self.previous = None
+        self.rotated_at = time.monotonic()
+
+    def _rotate_if_due(self):
+        if (time.monotonic() - self.rotated_at >= self.rotate_sec
+                or self.current.count >= self.capacity):
+            self.previous = self.current
+            self.current = BloomFilter(capacity=self.capacity, error_rate=self.error_rate)
+            self.rotated_at = time.monotonic()
+
+    def __contains__(self, cid):
+        return cid in self.current or (self.previous is not None and cid in self.previous)
+
+    def __len__(self):
+        return len(self.current) + (len(self.previous) if self.previous is not None else 0)
+
+    def add(self, cid):
+        self._rotate_if_due()
+        self.current.add(cid)
 
 def process_post(post, seen_posts):
     if post.cid not in seen_posts:
         author = post.author.display_name or post.author.handle
         created_at = post.indexed_at
-        timestamp = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        timestamp = parse_iso(created_at)
         age = humanize.naturaltime(datetime.now().astimezone() - timestamp)
 
         text = textwrap.fill(post.record.text, width=70)
@@ -30,40 +62,55 @@ def process_post(post, seen_posts):
     return False
 
 async def main() -> None:
-    client = AsyncClient()
-    await client.login(os.getenv('BSKY_HANDLE'), os.getenv('BSKY_APP_PASSWORD'))
+    client = await get_client()
 
     print("Monitoring timeline for new posts...")
 
-    seen_posts = set()
+    seen_posts = SeenPosts()
+
+    backoff = FETCH_NOTIFICATIONS_DELAY_SEC
+    new_posts = []
     cursor = None
-    oldest = None
+    pages = 0
 
     while True:
-        try:
-            timeline = await client.get_timeline(limit=1, cursor=cursor)
-            print(f"Got {len(timeline.feed)} new posts")
-            if not timeline.feed and not seen_posts:
-                cursor = timeline.cursor # startup go till we get a post since muted posts count in the limit but aren't returned
-                continue
-
+        error = False
+        # Newest-first sync: page back until we reach a post we've already shown
+        while pages < FETCH_MAX_PAGES:
+            try:
+                timeline = await client.get_timeline(limit=FETCH_LIMIT, cursor=cursor)
+            except Exception as e:
+                # keep new_posts and cursor so the next attempt resumes from this page
+                print(f"Error: {e}")
+                error = True
+                backoff = min(backoff * 2, 60)
+                break
+            backoff = FETCH_NOTIFICATIONS_DELAY_SEC
+            pages += 1
+            caught_up = False
             for fv in timeline.feed:
-                if process_post(fv.post, seen_posts):
-                    cursor = timeline.cursor
-                else:
-                    cursor = None
-                at = datetime.fromisoformat(fv.post.indexed_at.replace('Z', '+00:00'))
-                if oldest is None or at < oldest:
-                    oldest = at
-                    cursor = None # never page older
-            
-        except Exception as e:
-            print(f"Error: {e}")
+                if fv.post.cid in seen_posts:
+                    # a repost can resurface an old post above unseen ones, so only originals end the sync
+                    if fv.reason is None:
+                        caught_up = True
+                        break
+                    continue
+                new_posts.append(fv.post)
+            # on startup there is nothing to catch up to, so stop at the first page with posts
+            # (muted posts count toward the limit but aren't returned, so pages can come back empty)
+            if caught_up or not timeline.cursor or (new_posts and not seen_posts):
+                break
+            cursor = timeline.cursor
+
+        if not error:
+            print(f"Got {len(new_posts)} new posts")
+            for post in reversed(new_posts):
+                process_post(post, seen_posts)
+            new_posts = []
             cursor = None
-            await asyncio.sleep(10)
-            continue
+            pages = 0
 
-        await asyncio.sleep(FETCH_NOTIFICATIONS_DELAY_SEC)
+        await asyncio.sleep(backoff if error else FETCH_NOTIFICATIONS_DELAY_SEC)
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
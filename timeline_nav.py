@@ -1,11 +1,18 @@
 import curses
 import asyncio
-import time
+import os
+import signal
+import sys
 import textwrap
 from timeline import Timeline
-from typing import List, Set
+from typing import Dict, List, Set
+from datetime import datetime
 import json
 
+# Reused so wrapping doesn't construct a TextWrapper (and its regexes) per call
+_WRAPPER = textwrap.TextWrapper()
+_WRAP_CACHE_MAX = 4096
+
 class TimelineUI:
     def __init__(self, timeline: Timeline):
         self.timeline = timeline
@@ -13,23 +20,80 @@ class TimelineUI:
         self.expanded_posts: Set[int] = set()
         self.top_line = 0
         self.screen = None
+        self._pad = None  # Off-screen buffer each frame is drawn into
         self.max_y = 0
         self.max_x = 0
+        self._redraw_event = None
+        self._running = False
+        self._detail_lines: Dict[str, List[str]] = {}
+        self._wrap_cache: Dict[tuple, List[str]] = {}
+        self._prefetch_task = None
+        self._prefix: List[int] = None  # _prefix[i] is the total height of posts before i
 
     def write_wrapped_line(self, y: int, x: int, text: str, attr=curses.A_NORMAL) -> int:
         """Write a wrapped line to the screen and return number of lines used"""
         lines_used = 0
-        wrapped_lines = textwrap.wrap(text, width=self.max_x - x)
+        wrapped_lines = self.wrap(text, self.max_x - x)
         for wrapped_line in wrapped_lines:
             if y + lines_used < self.max_y:
                 try:
-                    self.screen.addstr(y + lines_used, x, wrapped_line, attr)
+                    self._pad.addstr(y + lines_used, x, wrapped_line, attr)
                 except curses.error:
                     pass  # Handle edge case when writing to bottom-right corner
                 lines_used += 1
         return lines_used
 
-    def draw_post(self, y: int, post_idx: int) -> int:
+    def wrap(self, text: str, width: int) -> List[str]:
+        """Wrap text to width, reusing earlier results for the same text and width"""
+        key = (text, width)
+        wrapped_lines = self._wrap_cache.get(key)
+        if wrapped_lines is None:
+            if len(self._wrap_cache) >= _WRAP_CACHE_MAX:
+                self._wrap_cache.clear()
+            _WRAPPER.width = width
+            wrapped_lines = _WRAPPER.wrap(text)
+            self._wrap_cache[key] = wrapped_lines
+        return wrapped_lines
+
+    def get_detail_lines(self, feed_view) -> List[str]:
+        """Return the expanded detail lines for a post, introspecting its record only once"""
+        cid = feed_view.post.cid
+        cached = self._detail_lines.get(cid)
+        if cached is not None:
+            return cached
+
+        post = feed_view.post.record
+        detail_lines = []
+        if post.reply:
+            if post.reply.root:
+                detail_lines.append(f"Reply to: {post.reply.root.uri}")
+        callables = []
+        lists = []
+        attributes = []
+        for attr in dir(post):
+            if not attr.startswith('_'):
+                value = getattr(post, attr)
+                if callable(value):
+                    callables.append(f"{value.__name__}()")
+                elif isinstance(value, (list, dict)):
+                    lists.append(f"{attr}[{len(value)}]")
+                else:
+                    if isinstance(value, str):
+                        attributes.append(f"{attr}:{value[:5]}")
+                    else:
+                        attributes.append(f"{attr}<{type(value).__name__}>")
+
+        detail_lines.append(f"Attributes: {', '.join(attributes)}")
+        detail_lines.append(f"Callables: {', '.join(callables)}")
+        detail_lines.append(f"Lists: {', '.join(lists)}")
+        json_str = json.dumps(json.loads(post.model_dump_json()), indent=2)
+        detail_lines.extend(json_str.splitlines())
+
+        # Records in the feed are immutable, so this never needs invalidating
+        self._detail_lines[cid] = detail_lines
+        return detail_lines
+
+    def draw_post(self, y: int, post_idx: int, now: datetime = None) -> int:
         """Draw a single post and return number of lines used"""
         if post_idx >= len(self.timeline.timeline):
             return 0
@@ -42,7 +106,7 @@ class TimelineUI:
         attr = curses.A_REVERSE if is_selected else curses.A_NORMAL
         
         # Basic post info
-        post_line = self.timeline.format_minimal_post(feed_view, post_idx + 1)
+        post_line = self.timeline.format_minimal_post(feed_view, post_idx + 1, now=now)
         lines_used += self.write_wrapped_line(y + lines_used, 0, post_line, attr)
 
         # If expanded, show details
@@ -54,42 +118,18 @@ class TimelineUI:
             #post_json = feed_view.post.model_dump_json()
             #lines_used += self.write_wrapped_line(y + lines_used, 4, post_json, curses.A_DIM)
             
-            post = feed_view.post.record
-            if post.reply:
-                if post.reply.root:
-                    lines_used += self.write_wrapped_line(y + lines_used, 4, f"Reply to: {post.reply.root.uri}", curses.A_DIM)
-            callables = []
-            lists = []
-            attributes = []
-            for attr in dir(post):
-                if not attr.startswith('_'):
-                    value = getattr(post, attr)
-                    if callable(value):
-                        callables.append(f"{value.__name__}()")
-                    elif isinstance(value, (list, dict)):
-                        lists.append(f"{attr}[{len(value)}]")
-                    else:
-                        if isinstance(value, str):
-                            attributes.append(f"{attr}:{value[:5]}")
-                        else:
-                            attributes.append(f"{attr}<{type(value).__name__}>")
-            
-            lines_used += self.write_wrapped_line(y + lines_used, 4, f"Attributes: {', '.join(attributes)}", curses.A_DIM)
-            lines_used += self.write_wrapped_line(y + lines_used, 4, f"Callables: {', '.join(callables)}", curses.A_DIM)
-            lines_used += self.write_wrapped_line(y + lines_used, 4, f"Lists: {', '.join(lists)}", curses.A_DIM)
-            json_str = json.dumps(json.loads(post.model_dump_json()), indent=2)
-            for line in json_str.splitlines():
+            for line in self.get_detail_lines(feed_view):
                 lines_used += self.write_wrapped_line(y + lines_used, 4, line, curses.A_DIM)
 
         return lines_used
 
     def draw_screen(self):
         """Draw the entire screen"""
-        self.screen.clear()
+        self._pad.erase()
         
         title = "Timeline Navigator (↑↓/j/k: Navigate, Enter/Space: Expand/Collapse, q: Quit)"
         try:
-            self.screen.addstr(0, 0, title[:self.max_x], curses.A_BOLD)
+            self._pad.addstr(0, 0, title[:self.max_x], curses.A_BOLD)
         except curses.error:
             pass
         
@@ -97,14 +137,18 @@ class TimelineUI:
         current_y = 1
         visible_posts = 0
         post_idx = self.top_line
+        now = datetime.now().astimezone()
 
         while current_y < self.max_y and post_idx < len(self.timeline.timeline):
-            lines_used = self.draw_post(current_y, post_idx)
+            lines_used = self.draw_post(current_y, post_idx, now=now)
             current_y += lines_used
             visible_posts += 1
             post_idx += 1
 
-        self.screen.refresh()
+        # Blit the finished frame in one go and let doupdate batch the terminal writes
+        self._pad.overwrite(self.screen, 0, 0, 0, 0, self.max_y - 1, self.max_x - 1)
+        self.screen.noutrefresh()
+        curses.doupdate()
 
     def handle_input(self, key: int):
         """Handle keyboard input"""
@@ -118,21 +162,49 @@ class TimelineUI:
         elif key in [curses.KEY_DOWN, ord('j')] and self.current_pos < len(self.timeline.timeline) - 1:
             self.current_pos += 1
             # Calculate if we need to scroll down
-            current_y = 1
-            for i in range(self.top_line, self.current_pos + 1):
-                if i in self.expanded_posts:
-                    current_y += len(self.timeline.format_detailed_post(self.timeline.timeline[i]))
-                else:
-                    current_y += 1
-                if current_y >= self.max_y:
-                    self.top_line += 1
-                    break
+            prefix = self.line_prefix()
+            if 1 + prefix[self.current_pos + 1] - prefix[self.top_line] >= self.max_y:
+                self.top_line += 1
+            self.maybe_prefetch()
         
         elif key in [ord('\n'), ord(' '), curses.KEY_RIGHT]:
             if self.current_pos in self.expanded_posts:
                 self.expanded_posts.remove(self.current_pos)
             else:
                 self.expanded_posts.add(self.current_pos)
+            self._prefix = None
+
+    def line_prefix(self) -> List[int]:
+        """Prefix sums of post heights, rebuilt only after expand/collapse, resize or new posts"""
+        posts = self.timeline.timeline
+        if self._prefix is None or len(self._prefix) != len(posts) + 1:
+            prefix = [0]
+            for i, feed_view in enumerate(posts):
+                if i in self.expanded_posts:
+                    height = self.timeline.format_detailed_post(feed_view, count_lines_only=True)
+                else:
+                    height = 1
+                prefix.append(prefix[-1] + height)
+            self._prefix = prefix
+        return self._prefix
+
+    def maybe_prefetch(self):
+        """Start fetching the next page in the background when nearing the end of the timeline"""
+        if self.current_pos <= len(self.timeline.timeline) - self.timeline.page_size:
+            return
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            return
+        self._prefetch_task = asyncio.create_task(self.timeline.fetch_next_page())
+        self._prefetch_task.add_done_callback(self._on_prefetch_done)
+
+    def _on_prefetch_done(self, task):
+        """Redraw once new posts arrive; failures are retried on the next scroll"""
+        if task.cancelled() or task.exception() is not None:
+            return
+        # Repeats add reposters to already-indexed posts, changing their heights
+        self._prefix = None
+        if task.result():
+            self._redraw_event.set()
 
     def setup_screen(self, stdscr):
         """Setup the curses screen with proper configurations"""
@@ -148,36 +220,72 @@ class TimelineUI:
         
         stdscr.nodelay(1)
         
+        # Wake the event loop only when there is input or the terminal resizes
+        loop = asyncio.get_running_loop()
+        loop.add_reader(sys.stdin.fileno(), self._on_input_ready)
+        loop.add_signal_handler(signal.SIGWINCH, self._on_resize)
+        
         return stdscr
 
-    async def run(self, stdscr):
-        """Main UI loop"""
-        self.screen = self.setup_screen(stdscr)
-        
+    def _on_input_ready(self):
+        """Drain pending keystrokes and schedule a redraw"""
         while True:
-            self.max_y, self.max_x = self.screen.getmaxyx()
-            self.draw_screen()
-            
             try:
                 key = self.screen.getch()
             except curses.error:
-                key = None
-
-            if key == ord('q'):
                 break
-                
-            self.handle_input(key)
-            
-            time.sleep(0.05)  # Add a small delay to avoid high CPU usage
+            if key == -1:
+                break
+            if key == ord('q'):
+                self._running = False
+            elif key != curses.KEY_RESIZE:
+                self.handle_input(key)
+        self._redraw_event.set()
+
+    def _on_resize(self):
+        """Resize curses to the new terminal size and schedule a redraw"""
+        cols, lines = os.get_terminal_size(sys.stdout.fileno())
+        curses.resizeterm(lines, cols)
+        self._redraw_event.set()
+
+    async def run(self, stdscr):
+        """Main UI loop"""
+        self._redraw_event = asyncio.Event()
+        self._running = True
+        self.screen = self.setup_screen(stdscr)
+        loop = asyncio.get_running_loop()
+        
+        try:
+            while self._running:
+                max_y, max_x = self.max_y, self.max_x
+                self.max_y, self.max_x = self.screen.getmaxyx()
+                if self.max_x != max_x:
+                    self._wrap_cache.clear()
+                    self._prefix = None
+                if self._pad is None or (self.max_y, self.max_x) != (max_y, max_x):
+                    self._pad = curses.newpad(self.max_y, self.max_x)
+                self.draw_screen()
+                await self._redraw_event.wait()
+                self._redraw_event.clear()
+        finally:
+            loop.remove_reader(sys.stdin.fileno())
+            loop.remove_signal_handler(signal.SIGWINCH)
 
 async def main():
     # Initialize timeline
     timeline = Timeline()
     await timeline.initialize()
     
-    # Start the UI
+    # Start the UI; curses.wrapper can't await a coroutine, so set up and restore the terminal here
     ui = TimelineUI(timeline)
-    await curses.wrapper(ui.run)
+    stdscr = curses.initscr()
+    try:
+        await ui.run(stdscr)
+    finally:
+        stdscr.keypad(False)
+        curses.nocbreak()
+        curses.echo()
+        curses.endwin()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file